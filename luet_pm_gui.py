@@ -1,15 +1,43 @@
 import gi
+import collections
+import concurrent.futures
 import subprocess
 import json
 import os
 import re
+import sys
 import threading
 import time
 import webbrowser
 
 gi.require_version('Gtk', '3.0')
-gi.require_version('Vte', '2.91')
-from gi.repository import Gtk, GLib, Gdk, GdkPixbuf, Vte
+from gi.repository import Gtk, GLib, Gdk
+
+# Packages that can't be removed, keyed by "category/name". Built once at
+# import so every search result is checked with a single hash lookup.
+PROTECTED_PACKAGE_MESSAGE = "This package is protected and can't be removed"
+PROTECTED_LAYER_MESSAGE = "This layer is protected and can't be removed"
+PROTECTED_APPLICATIONS = {
+    "apps/grub": PROTECTED_PACKAGE_MESSAGE,
+    "system/luet": PROTECTED_PACKAGE_MESSAGE,
+    "layers/system-x": PROTECTED_LAYER_MESSAGE,
+    "layers/sys-fs": PROTECTED_LAYER_MESSAGE,
+    "layers/X": PROTECTED_LAYER_MESSAGE,
+    # Add more protected applications as needed
+}
+
+# "Action" column values shown for packages that are installed
+INSTALLED_ACTIONS = frozenset({"Remove", "Protected"})
+
+# Start of the version in a "category/name-version" token printed by luet oscheck
+VERSION_SUFFIX_RE = re.compile(r'-\d')
+
+# Seconds a search result may be reused. luet can also change the installed
+# packages outside this GUI, so cached rows must not be trusted for long.
+SEARCH_CACHE_TTL = 30
+
+# Packages whose details lookups are kept, the oldest lookup is dropped beyond this
+LOOKUP_CACHE_SIZE = 256
 
 class AboutDialog(Gtk.AboutDialog):
     def __init__(self, parent):
@@ -59,25 +87,29 @@ class AboutDialog(Gtk.AboutDialog):
 class RepositoryUpdater:
     @staticmethod
     def run_repo_update(app):
+        update_succeeded = False
         try:
             # Run the repository update command
             update_command = "luet repo update"
             result = subprocess.run(["sh", "-c", update_command], text=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            if result.returncode == 0:
-                # Update status message
-                app.set_status_message("Repositories updated")
-            else:
-                app.set_status_message("Error updating repositories")
-        except Exception as e:
-            # Handle exceptions
+            update_succeeded = result.returncode == 0
+            # Repositories may offer new versions, so cached search results and file lists are stale
+            app.clear_search_cache()
+            PackageDetailsPopup.forget_lookups(PackageDetailsPopup.package_files_cache)
+        except (OSError, UnicodeDecodeError) as e:
+            # Spawning the command or decoding its output as text can fail here
             print(f"Error updating repositories: {str(e)}")
         finally:
-            # Re-enable GUI after update process completes
+            # Re-enable GUI after update process completes, even if something unexpected was raised
             with app.lock:
                 GLib.idle_add(app.enable_gui)
                 GLib.idle_add(app.stop_spinner)
-                if result.returncode == 0:
-                    GLib.idle_add(app.set_status_message, "Repositories updated")
+
+        # Update status message once the spinner is gone, so stopping it can't pop the message
+        if update_succeeded:
+            app.set_status_message("Repositories updated")
+        else:
+            app.set_status_message("Error updating repositories")
 
 class SystemChecker:
     def __init__(self, search_app_instance):
@@ -116,7 +148,10 @@ class SystemChecker:
 
                     if '/' in word:
                         # Find the index of the first '-' followed by a number using regular expressions
-                        match = re.search(r'-\d', word)
+                        match = VERSION_SUFFIX_RE.search(word)
+                        if match is None:
+                            # Not a category/name-version token
+                            continue
                         index = match.start()
                         word = word[:index]
                         words_dict[word] = True
@@ -128,19 +163,17 @@ class SystemChecker:
 
                     reinstall_command = "luet reinstall -y " + word
                     result = subprocess.run(["sh", "-c", reinstall_command], text=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+                    # Reinstalling changes the system, so cached search results are stale
+                    self.search_app_instance.clear_search_cache()
 
                     if result.returncode != 0:
                         # If reinstallation fails, update the status message and stop the spinner animation
-                        GLib.idle_add(self.search_app_instance.set_status_message, "Failed installing")
                         GLib.idle_add(self.search_app_instance.stop_spinner)
+                        GLib.idle_add(self.search_app_instance.set_status_message, "Failed installing")
+                        # One failed package means the system could not be repaired
                         repair = 0
-                    else:
-                        # If reinstallation succeeds, update the status message
-                        repair = 1
 
-                    # Wait for a short time to show the spinner animation
-                    GLib.idle_add(self.search_app_instance.stop_spinner)
-                    time.sleep(1)
+                    # Move on to the next package right away; start_spinner replaces the running spinner
 
                 # After the loop completes, update the status message based on the repair result
                 if repair == 0:
@@ -167,83 +200,72 @@ class SystemChecker:
 
 class PackageOperations:
     @staticmethod
-    def run_installation(app, install_command, package_name, advanced_search):
+    def run_installation(app, install_command, category, package_name, advanced_search):
         try:
             # Update the status bar with "Installing [package name]"
             app.set_status_message(f"Installing {package_name}...")
 
             result = subprocess.run(["sh", "-c", install_command], text=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            if result.returncode == 0:
-                # Start searching for the same package name after installation
-                if app.last_search:
-                    # Disable GUI while search is running
-                    app.disable_gui()
-                    search_command = f"luet search -o json -q {app.last_search}"
-                    if advanced_search:
-                        search_command = f"luet search -o json --by-label-regex {app.last_search}"
-                    # Stop the spinner animation
-                    app.stop_spinner()
-                    # Update the status bar to indicate searching again
-                    app.start_spinner(f"Searching again for '{app.last_search}'...")
-                    # Start the search thread
-                    app.start_search_thread(search_command)
-                else:
-                    # Update the status bar with "Ready" once installation is complete
-                    app.set_status_message("Ready")
-            else:
-                # Update the status bar with an error message
-                app.set_status_message("Error installing package")
+            # Installed packages may have changed, so cached search results and package details are stale
+            app.clear_search_cache()
+            PackageDetailsPopup.forget_lookups(PackageDetailsPopup.required_by_cache, PackageDetailsPopup.package_files_cache)
+            succeeded = result.returncode == 0
         except Exception as e:
             print(f"Error installing package: {str(e)}")
-        finally:
-            # Enable GUI after installation is completed or if an error occurs
-            GLib.idle_add(app.enable_gui)
+            succeeded = False
+
+        # Only the command runs in this thread, the GUI is updated in the main GTK thread
+        GLib.idle_add(app.finish_package_operation, succeeded, "Error installing package", advanced_search, category, package_name, "Remove")
+
+        # Refresh the desktop menu after reporting the result, so the GUI doesn't wait for it
+        if succeeded:
+            PackageOperations.refresh_desktop_menu()
+
+    @staticmethod
+    def refresh_desktop_menu():
+        # Let desktop menus pick up launchers of newly installed packages
+        try:
+            subprocess.run(["xdg-desktop-menu", "forceupdate"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except OSError as e:
+            print(f"Error updating desktop menu: {str(e)}")
 
     @staticmethod
     def run_uninstallation(app, uninstall_command, category, package_name, advanced_search):
+        package_key = f"{category}/{package_name}"
         try:
             # Update the status bar with "Uninstalling [package name]"
             app.set_status_message(f"Uninstalling {package_name}...")
 
-            process = subprocess.Popen(["sh", "-c", uninstall_command], text=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            while process.poll() is None:  # While the process is running
-                Gtk.main_iteration_do(False)  # Process GTK events without blocking
-
-            # Process has finished, read stdout and stderr
-            stdout, stderr = process.communicate()
-            if process.returncode == 0:
-                if app.last_search:
-                    search_command = f"luet search -o json -q {app.last_search}"
-                    if advanced_search:
-                        search_command = f"luet search -o json --by-label-regex {app.last_search}"
-                    # Stop the spinner animation
-                    app.stop_spinner()
-                    # Update the status bar to indicate searching again
-                    app.start_spinner(f"Searching again for '{app.last_search}'...")
-                    # Start the search thread
-                    app.start_search_thread(search_command)
-                else:
-                    # Update the status bar with "Ready" once uninstallation is complete
-                    app.set_status_message("Ready")
-            else:
-                # Stop the spinner animation
-                app.stop_spinner()
-                # Update the status bar with an error message using GLib.idle_add
-                GLib.idle_add(app.set_status_message, f"Error uninstalling package: '{category}/{package_name}'")
-
+            # Block this worker thread until the command exits; the GTK main loop keeps running
+            result = subprocess.run(["sh", "-c", uninstall_command], text=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            # Installed packages may have changed, so cached search results and package details are stale
+            app.clear_search_cache()
+            PackageDetailsPopup.forget_lookups(PackageDetailsPopup.required_by_cache, PackageDetailsPopup.package_files_cache)
+            succeeded = result.returncode == 0
         except Exception as e:
             print(f"Error uninstalling package: {str(e)}")
-        finally:
-            # Enable GUI after uninstallation is completed or if an error occurs
-            GLib.idle_add(app.enable_gui)
+            succeeded = False
+
+        # Only the command runs in this thread, the GUI is updated in the main GTK thread
+        GLib.idle_add(app.finish_package_operation, succeeded, f"Error uninstalling package: '{package_key}'", advanced_search, category, package_name, "Install")
 
 class PackageDetailsPopup(Gtk.Window):
+    # Sorted "category/name" reverse deps keyed by (category, name), shared by all popups
+    required_by_cache = collections.OrderedDict()
+    # Package file lists keyed by (category, name), shared by all popups
+    package_files_cache = collections.OrderedDict()
+    # Guards both caches, which are written by the lookup threads and cleared by the package operation workers
+    cache_lock = threading.Lock()
+    # Package file lookups still running, keyed by (category, name)
+    package_files_lookups = {}
+    # Worker threads for the luet lookups of all popups, reused instead of one thread per lookup
+    lookup_executor = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+
     def __init__(self, package_info):
         super().__init__(title="Package Details")
         self.set_default_size(800, 300)
 
         self.package_info = package_info
-        self.loaded_package_files = {}
         self.required_by_info = None
 
         category = package_info.get("category", "")
@@ -298,6 +320,9 @@ class PackageDetailsPopup(Gtk.Window):
 
         self.package_files_expander.connect("activate", self.load_package_files_info)
 
+        # The files are usually looked at next, so start fetching them while the popup is read
+        self.prefetch_package_files_info(category, name)
+
         close_button = Gtk.Button(label="Close")
         close_button.connect("clicked", self.on_close_button_clicked)
 
@@ -308,40 +333,83 @@ class PackageDetailsPopup(Gtk.Window):
     def load_required_by_info(self):
         category = self.package_info.get("category", "")
         name = self.package_info.get("name", "")
-        thread = threading.Thread(target=self.retrieve_required_by_info, args=(category, name))
-        thread.start()
+        # Reverse deps only change when packages are installed or removed, so reuse earlier lookups.
+        # A single get, as the entry may be dropped at any time and luet must not run in this thread
+        sorted_required_by_info = PackageDetailsPopup.required_by_cache.get((category, name))
+        if sorted_required_by_info is not None:
+            self.show_required_by_info(sorted_required_by_info)
+        else:
+            PackageDetailsPopup.lookup_executor.submit(self.retrieve_required_by_info, category, name)
 
     def retrieve_required_by_info(self, category, name):
+        sorted_required_by_info = None
         required_by_info = self.get_required_by_info(category, name)
         if required_by_info is not None:
-            sorted_required_by_info = sorted(required_by_info, key=lambda x: (x.split('/')[0], x.split('/')[1]))
+            sorted_required_by_info = sorted(required_by_info, key=lambda x: x.split('/', 1))
+            PackageDetailsPopup.remember_lookup(PackageDetailsPopup.required_by_cache, (category, name), sorted_required_by_info)
+        self.show_required_by_info(sorted_required_by_info)
+
+    def show_required_by_info(self, sorted_required_by_info):
+        if sorted_required_by_info is not None:
             required_by_count = len(sorted_required_by_info)
             self.update_expander_label(self.required_by_expander, required_by_count)
             if sorted_required_by_info:
                 required_by_text = "\n".join(sorted_required_by_info)
                 if required_by_count > 4:
-                    self.required_by_textview.set_size_request(-1, -1)
+                    GLib.idle_add(self.required_by_textview.set_size_request, -1, -1)
             else:
                 required_by_text = "There are no packages installed that require this package."
-            self.update_textview(self.required_by_textview, required_by_text)
         else:
-            self.update_textview(self.required_by_textview, "Error retrieving required by information.")
+            required_by_text = "Error retrieving required by information."
+
+        # Only the lookup runs in a worker thread, the textview is updated in the main GTK thread
+        GLib.idle_add(self.update_textview, self.required_by_textview, required_by_text)
 
     def load_package_files_info(self, *args):
         category = self.package_info.get("category", "")
         name = self.package_info.get("name", "")
-        if (category, name) in self.loaded_package_files:
-            files_info = self.loaded_package_files[(category, name)]
-            self.update_package_files_text(files_info)
-        else:
-            self.update_textview(self.package_files_textview, "Loading...")
-            thread = threading.Thread(target=self.retrieve_package_files_info, args=(category, name))
-            thread.start()
+        self.update_textview(self.package_files_textview, "Loading...")
+        # Wait for the prefetch if it's still running instead of starting a second lookup
+        lookup = self.prefetch_package_files_info(category, name)
+        lookup.add_done_callback(lambda future: self.update_package_files_text(future.result()))
+
+    def prefetch_package_files_info(self, category, name):
+        # Returns the running lookup of these files, a finished one for cached files, or starts a new one
+        lookup = PackageDetailsPopup.package_files_lookups.get((category, name))
+        if lookup is None:
+            # A single get, as another popup's lookup may drop this entry from the cache at any time
+            files_info = PackageDetailsPopup.package_files_cache.get((category, name))
+            if files_info is not None:
+                lookup = concurrent.futures.Future()
+                lookup.set_result(files_info)
+            else:
+                lookup = PackageDetailsPopup.lookup_executor.submit(self.retrieve_package_files_info, category, name)
+                PackageDetailsPopup.package_files_lookups[(category, name)] = lookup
+                # Registered after storing the lookup, so it's removed even if it already finished
+                lookup.add_done_callback(lambda future: PackageDetailsPopup.package_files_lookups.pop((category, name), None))
+        return lookup
 
     def retrieve_package_files_info(self, category, name):
         package_files_info = self.get_package_files_info(category, name)
-        self.loaded_package_files[(category, name)] = package_files_info
-        self.update_package_files_text(package_files_info)
+        # Keep successful lookups only, so a failed one is retried next time
+        if package_files_info is not None:
+            PackageDetailsPopup.remember_lookup(PackageDetailsPopup.package_files_cache, (category, name), package_files_info)
+        return package_files_info
+
+    @staticmethod
+    def remember_lookup(cache, key, value):
+        # Every viewed package adds an entry, so keep only the most recent ones for a long session
+        with PackageDetailsPopup.cache_lock:
+            cache[key] = value
+            cache.move_to_end(key)
+            while len(cache) > LOOKUP_CACHE_SIZE:
+                cache.popitem(last=False)
+
+    @staticmethod
+    def forget_lookups(*caches):
+        with PackageDetailsPopup.cache_lock:
+            for cache in caches:
+                cache.clear()
 
     def update_package_files_text(self, files_info):
         if files_info is not None:
@@ -356,8 +424,11 @@ class PackageDetailsPopup(Gtk.Window):
         GLib.idle_add(lambda: self.update_textview(self.package_files_textview, files_text))
 
     def update_expander_label(self, expander, count):
-        label_text = f"{expander.get_label()} ({count})"
-        GLib.idle_add(lambda: expander.set_label(label_text))
+        # Called from the lookup threads, so the label is both read and set in the main GTK thread
+        def append_count():
+            expander.set_label(f"{expander.get_label()} ({count})")
+
+        GLib.idle_add(append_count)
 
     def update_textview(self, textview, text):
         buffer = textview.get_buffer()
@@ -419,11 +490,19 @@ class SearchApp(Gtk.Window):
         self.set_icon_name("luet_pm_gui")  # Add this line
 
         self.last_search = ""  # Store the last entered search string
+        self.search_cache = collections.OrderedDict()  # (time.monotonic() timestamp, result rows) keyed by search command, oldest first
+        self.search_cache_lock = threading.Lock()  # The search cache is used from the search and package operation threads
+        self.results_generation = 0  # Bumped by every search, package operation, repo update and system check started from the GUI
         self.search_thread = None  # Thread for search process
         self.repo_update_thread = None  # Thread for repository update process
         self.lock = threading.Lock()  # Lock for thread-safe access to shared resources
         # Define a lock for thread-safe access to status message
         self.status_message_lock = threading.Lock()
+        # Message currently shown in the status bar, None when the spinner owns it
+        self.status_message = None
+        # Newest requested message and whether an idle callback will show it
+        self.pending_status_message = None
+        self.status_update_scheduled = False
 
         if os.getuid() == 0:
             # Running as root, initialize the search UI
@@ -432,55 +511,36 @@ class SearchApp(Gtk.Window):
             # Not running as root, display a message and close button
             self.init_permission_error_ui()
 
-        # Define the protected_applications dictionary
-        self.protected_applications = {
-            "apps/grub": "This package is protected and can't be removed",
-            "system/luet": "This package is protected and can't be removed",
-            "layers/system-x": "This layer is protected and can't be removed",
-            "layers/sys-fs": "This layer is protected and can't be removed",
-            "layers/X": "This layer is protected and can't be removed",
-            # Add more protected applications as needed
-        }
-
     def create_menu(self, menu_bar):
-        # Create the "File" menu
-        file_menu = Gtk.Menu()
-
-        # Create "Update repositories" item under "File"
-        update_repositories_item = Gtk.MenuItem(label="Update Repositories")
-        update_repositories_item.connect("activate", self.update_repositories)
-        file_menu.append(update_repositories_item)
-
-        # Create "Check system" item under "File"
-        check_system_item = Gtk.MenuItem(label="Check system")
-        check_system_item.connect("activate", self.check_system)
-        file_menu.append(check_system_item)
-
-        # Create "Quit" item under "File"
-        quit_item = Gtk.MenuItem(label="Quit")
-        quit_item.connect("activate", Gtk.main_quit)
-        file_menu.append(quit_item)
-
-        # Create the "Help" menu
-        help_menu = Gtk.Menu()
-
-        # Create "About" item under "Help"
-        about_item = Gtk.MenuItem(label="About")
-        about_item.connect("activate", self.show_about_dialog)
-        help_menu.append(about_item)
-
-        # Create "File" and "Help" menu items in the menu bar
-        file_menu_item = Gtk.MenuItem(label="File")
-        file_menu_item.set_submenu(file_menu)
-        help_menu_item = Gtk.MenuItem(label="Help")
-        help_menu_item.set_submenu(help_menu)
-
-        menu_bar.append(file_menu_item)
-        menu_bar.append(help_menu_item)
+        # Menu bar layout: each menu title with its (label, handler) items
+        menus = [
+            ("File", [
+                ("Update Repositories", self.update_repositories),
+                ("Check system", self.check_system),
+                ("Quit", Gtk.main_quit),
+            ]),
+            ("Help", [
+                ("About", self.show_about_dialog),
+            ]),
+        ]
+
+        for title, items in menus:
+            submenu = Gtk.Menu()
+            for label, handler in items:
+                # Each item calls its handler directly when activated
+                menu_item = Gtk.MenuItem(label=label)
+                menu_item.connect("activate", handler)
+                submenu.append(menu_item)
+
+            # Create the menu item in the menu bar
+            title_item = Gtk.MenuItem(label=title)
+            title_item.set_submenu(submenu)
+            menu_bar.append(title_item)
 
     def update_repositories(self, widget):
         # Disable GUI while update is running
         self.disable_gui()
+        self.results_generation += 1
 
         # Start the spinner animation
         self.start_spinner("Updating repositories...")
@@ -493,6 +553,7 @@ class SearchApp(Gtk.Window):
     def check_system(self, widget):
         # Disable GUI while check system is running
         self.disable_gui()
+        self.results_generation += 1
 
         # Start the spinner animation
         self.start_spinner("Checking system for missing files...")
@@ -536,6 +597,8 @@ class SearchApp(Gtk.Window):
         self.treeview = Gtk.TreeView()
         self.liststore = Gtk.ListStore(str, str, str, str, str, str)  # Added a string column for "Action" and "Name"
         self.treeview.set_model(self.liststore)
+        # Rows last appended to the liststore, used to skip no-op refreshes
+        self.displayed_rows = []
 
         renderer = Gtk.CellRendererText()
         renderer.set_alignment(0, 0.5)  # Align text to the left
@@ -559,6 +622,13 @@ class SearchApp(Gtk.Window):
         # Add buttons in the "Action" column for rows with "Installed" value set to true
         self.add_action_buttons()
 
+        # Map the text in the "Action" column to the method handling a click on it
+        self.action_handlers = {
+            "Protected": self.show_protected_popup,
+            "Install": self.confirm_install,
+            "Remove": self.confirm_uninstall,
+        }
+
         scrolled_window = Gtk.ScrolledWindow()
         scrolled_window.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
         scrolled_window.add(self.treeview)
@@ -597,29 +667,34 @@ class SearchApp(Gtk.Window):
         self.spinner_frames = ["⠋", "⠙", "⠹", "⠸", "⠼", "⠴", "⠦", "⠧", "⠇", "⠏"]
         self.spinner_counter = 0
         self.spinner_timeout_id = None
+        self.spinner_frame_pushed = False  # Whether a spinner frame sits on the status bar stack
+
+        # Whether the search widgets and menus currently accept input
+        self.gui_sensitive = True
 
     def disable_gui(self):
-        # Disable GUI elements
-        self.search_entry.set_sensitive(False)
-        self.advanced_search_checkbox.set_sensitive(False)
-        self.search_button.set_sensitive(False)
-        self.treeview.set_sensitive(False)
-        self.disable_menu_items()
+        self.set_gui_sensitive(False)
 
     def enable_gui(self):
         # Acquire lock before modifying GUI elements
         with self.lock:
-            # Enable GUI elements
-            self.search_entry.set_sensitive(True)
-            self.advanced_search_checkbox.set_sensitive(True)
-            self.search_button.set_sensitive(True)
-            self.treeview.set_sensitive(True)
-
-            # Enable menu items
+            self.set_gui_sensitive(True)
+
+    def set_gui_sensitive(self, sensitive):
+        # Nothing to do when the GUI is already in the requested state
+        if sensitive == self.gui_sensitive:
+            return
+        self.gui_sensitive = sensitive
+
+        # Enable or disable GUI elements
+        self.search_entry.set_sensitive(sensitive)
+        self.advanced_search_checkbox.set_sensitive(sensitive)
+        self.search_button.set_sensitive(sensitive)
+        self.treeview.set_sensitive(sensitive)
+        if sensitive:
             self.enable_menu_items()
-
-            # Schedule enabling GUI after search is completed in the main GTK thread
-            GLib.idle_add(self.enable_gui_after_search)
+        else:
+            self.disable_menu_items()
 
     def disable_menu_items(self):
         # Disable menu items
@@ -633,23 +708,17 @@ class SearchApp(Gtk.Window):
             if isinstance(menu_item, Gtk.MenuItem):
                 menu_item.set_sensitive(True)
 
-    def enable_gui_after_search(self):
-        # This method is called in the main GTK thread to enable GUI after search is completed
-        self.search_entry.set_sensitive(True)
-        self.search_button.set_sensitive(True)
-        self.treeview.set_sensitive(True)
-
     def on_search_clicked(self, widget):
         package_name = self.search_entry.get_text()
         if package_name:
+            # A search is still in flight, so drop this one instead of blocking the GUI on join()
+            if self.search_thread and self.search_thread.is_alive():
+                return
+
             advanced_search = self.advanced_search_checkbox.get_active()
-            if advanced_search:  
-                search_command = f"luet search -o json --by-label-regex {package_name}"
-            else:
-                search_command = f"luet search -o json -q {package_name}"
+            search_command = self.build_search_command(package_name, advanced_search)
             self.last_search = package_name
-            if self.search_thread and self.search_thread.is_alive():
-                self.search_thread.join()
+            self.results_generation += 1
 
             self.start_spinner(f"Searching for {package_name}...")
             self.disable_gui()
@@ -658,53 +727,59 @@ class SearchApp(Gtk.Window):
                 self.search_thread = threading.Thread(target=self.run_search, args=(search_command,))
                 self.search_thread.start()
 
+    def build_search_command(self, package_name, advanced_search):
+        # Pass the query as its own argument, so no shell runs and nothing needs escaping
+        if advanced_search:
+            return ("luet", "search", "-o", "json", "--by-label-regex", package_name)
+        return ("luet", "search", "-o", "json", "-q", package_name)
+
+    def finish_package_operation(self, succeeded, error_message, advanced_search, category, name, action_text):
+        # Called in the main GTK thread once an install or uninstall command has finished
+        self.stop_spinner()
+        if succeeded:
+            # Flip the action of the affected row in place instead of waiting for a new search
+            self.update_package_action(category, name, action_text)
+
+        # Update the status bar with "Ready" or the error once the operation is complete
+        self.set_status_message("Ready" if succeeded else error_message)
+        self.enable_gui()
+
+        if succeeded and self.last_search:
+            # Dependencies may have changed as well, so search again quietly in the background;
+            # the view is only rebuilt if the new results differ from the patched rows
+            search_command = self.build_search_command(self.last_search, advanced_search)
+            refresh_thread = threading.Thread(target=self.refresh_search_results, args=(search_command, self.results_generation))
+            refresh_thread.start()
+
+    def update_package_action(self, category, name, action_text):
+        for row in self.liststore:
+            if row[0] == category and row[1] == name:
+                row[4] = action_text
+
+        # The displayed rows are shared with the (now cleared) search cache, so patch a copy
+        self.displayed_rows = [
+            row[:4] + [action_text] + row[5:] if row[0] == category and row[1] == name else row
+            for row in self.displayed_rows
+        ]
+
     def run_search(self, search_command):
         try:
-            result = subprocess.run(["sh", "-c", search_command], text=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            # A search repeated shortly after is answered from memory, the cache is also
+            # dropped whenever packages change from this GUI
+            with self.search_cache_lock:
+                cached = self.search_cache.get(search_command)
+            if cached is not None and time.monotonic() - cached[0] < SEARCH_CACHE_TTL:
+                self.show_search_results(cached[1])
+                return
+
+            result = subprocess.run(search_command, text=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
             if result.returncode == 0:
                 output = result.stdout.strip()
                 try:
                     data = json.loads(output)
-                    packages = data.get("packages")
-                    if packages is not None:
-                        def append_to_liststore():
-                            # Clear the liststore before appending new data
-                            self.liststore.clear()
-
-                            for package_info in packages:
-                                category = package_info.get("category", "")
-                                name = package_info.get("name", "")
-                                version = package_info.get("version", "")
-                                repository = package_info.get("repository", "")
-                                installed = package_info.get("installed", False)
-                                package_key = f"{category}/{name}"
-                                # Check if the package is in the protected_applications dictionary
-                                if package_key in self.protected_applications:
-                                    # Set the action for the package to "Protected"
-                                    action_text = "Protected"
-                                else:
-                                    action_text = "Remove" if installed else "Install"
-
-                                # Append a new column for "Details"
-                                self.liststore.append([category, name, version, repository, action_text, "Details"])
-
-                            num_results = len(packages)  # Calculate the number of results
-                            if num_results > 0:
-                                # Update the status message after appending data to liststore
-                                self.set_status_message(f"Found {num_results} results matching '{self.last_search}'")
-                            else:
-                                self.set_status_message("No results")
-
-                        # Schedule appending data to liststore in the main GTK thread
-                        GLib.idle_add(append_to_liststore)
-                    else:
-                        # Clear the liststore when 'packages' is None
-                        def clear_liststore_and_status():
-                            self.liststore.clear()
-                            self.set_status_message("No results")
-
-                        # Schedule clearing liststore and updating status message in the main GTK thread
-                        GLib.idle_add(clear_liststore_and_status)
+                    rows = self.build_result_rows(data.get("packages"))
+                    self.remember_search(search_command, rows)
+                    self.show_search_results(rows)
 
                 except json.JSONDecodeError:
                     self.result_label.set_text("Invalid JSON output.")
@@ -725,6 +800,110 @@ class SearchApp(Gtk.Window):
             # Stop the spinner animation
             GLib.idle_add(self.stop_spinner)
 
+    def refresh_search_results(self, search_command, generation):
+        # Runs in a background thread without touching the spinner or the GUI sensitivity
+        try:
+            result = subprocess.run(search_command, text=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            if result.returncode != 0:
+                return
+            rows = self.build_result_rows(json.loads(result.stdout).get("packages"))
+        except (OSError, json.JSONDecodeError):
+            return
+        GLib.idle_add(self.apply_refreshed_rows, search_command, rows, generation)
+
+    def apply_refreshed_rows(self, search_command, rows, generation):
+        # Another search or package operation started meanwhile, so these rows may be stale
+        if generation != self.results_generation:
+            return
+        self.remember_search(search_command, rows)
+        if rows is not None and rows != self.displayed_rows:
+            self.show_search_results(rows)
+
+    def remember_search(self, search_command, rows):
+        now = time.monotonic()
+        with self.search_cache_lock:
+            self.search_cache[search_command] = (now, rows)
+            self.search_cache.move_to_end(search_command)
+            # Expired results are never served again, and being oldest they are first in line,
+            # so drop them instead of keeping their rows for the whole session
+            while now - next(iter(self.search_cache.values()))[0] >= SEARCH_CACHE_TTL:
+                self.search_cache.popitem(last=False)
+
+    def clear_search_cache(self):
+        with self.search_cache_lock:
+            self.search_cache.clear()
+
+    def build_result_rows(self, packages):
+        # Runs in the search thread, so the main GTK thread only has to fill the liststore
+        if packages is None:
+            return None
+
+        # Bind the globals and methods used for every package to locals once
+        intern = sys.intern
+        protected_applications = PROTECTED_APPLICATIONS
+        rows = []
+        append_row = rows.append
+
+        for package_info in packages:
+            get = package_info.get
+            # Categories and repositories repeat across many rows, so share one string object each
+            category = intern(get("category", ""))
+            name = get("name", "")
+            version = get("version", "")
+            repository = intern(get("repository", ""))
+            installed = get("installed", False)
+            package_key = f"{category}/{name}"
+            # Check if the package is in the PROTECTED_APPLICATIONS dictionary
+            if package_key in protected_applications:
+                # Set the action for the package to "Protected"
+                action_text = "Protected"
+            else:
+                action_text = "Remove" if installed else "Install"
+
+            # Append a new column for "Details"
+            append_row([category, name, version, repository, action_text, "Details"])
+        return rows
+
+    def show_search_results(self, rows):
+        if rows is not None:
+            def append_to_liststore():
+                # Leave the view alone when it already shows exactly these rows
+                if rows != self.displayed_rows:
+                    # Detach the model and suspend sorting while filling it, so the
+                    # TreeView doesn't re-sort and update itself after every single row
+                    sort_column_id, sort_order = self.liststore.get_sort_column_id()
+                    self.treeview.set_model(None)
+                    self.liststore.set_sort_column_id(Gtk.TREE_SORTABLE_UNSORTED_SORT_COLUMN_ID, Gtk.SortType.ASCENDING)
+
+                    # Clear the liststore before appending new data
+                    self.clear_liststore()
+                    for row in rows:
+                        self.liststore.append(row)
+                    self.displayed_rows = rows
+
+                    # Restore the user's sort order and reattach the filled model in one go
+                    if sort_column_id is not None:
+                        self.liststore.set_sort_column_id(sort_column_id, sort_order)
+                    self.treeview.set_model(self.liststore)
+
+                num_results = len(rows)  # Calculate the number of results
+                if num_results > 0:
+                    # Update the status message after appending data to liststore
+                    self.set_status_message(f"Found {num_results} results matching '{self.last_search}'")
+                else:
+                    self.set_status_message("No results")
+
+            # Schedule appending data to liststore in the main GTK thread
+            GLib.idle_add(append_to_liststore)
+        else:
+            # Clear the liststore when 'packages' is None
+            def clear_liststore_and_status():
+                self.clear_liststore()
+                self.set_status_message("No results")
+
+            # Schedule clearing liststore and updating status message in the main GTK thread
+            GLib.idle_add(clear_liststore_and_status)
+
     def add_action_buttons(self):
         # Create a button for the "Action" column
         renderer = Gtk.CellRendererText()
@@ -744,56 +923,39 @@ class SearchApp(Gtk.Window):
 
     def on_treeview_button_clicked(self, treeview, event):
         if event.type == Gdk.EventType.BUTTON_PRESS and event.button == Gdk.BUTTON_PRIMARY:
-            # Get the path at the clicked position
-            path = treeview.get_path_at_pos(int(event.x), int(event.y))
-            if path is not None:
-                row = path[0]  # Extract the row from the path
-
-                # Check if the click occurred on the "Action" column
-                column = self.treeview.get_column(4)  # Get the "Action" column
-                cell_area = treeview.get_cell_area(row, column)
-                cell_x, cell_y, cell_width, cell_height = cell_area.x, cell_area.y, cell_area.width, cell_area.height
-
-                # Check if the click occurred within the boundaries of the "Action" cell
-                if event.x >= cell_x and event.x <= cell_x + cell_width and \
-                event.y >= cell_y and event.y <= cell_y + cell_height:
+            # Get the path and the column at the clicked position
+            path_info = treeview.get_path_at_pos(int(event.x), int(event.y))
+            if path_info is not None:
+                row, column = path_info[0], path_info[1]  # Extract the row and column from the hit
+
+                # GTK already did the hit test, so compare the column instead of redoing the cell geometry
+                if column is self.treeview.get_column(4):  # The "Action" column
                     iter = self.liststore.get_iter(row)
                     action = self.liststore.get_value(iter, 4)  # Get the action text
 
-                    if action == "Protected":
-                        self.show_protected_popup(row)  # Pass the row index
-
-                    if action == "Install":
-                        self.confirm_install(iter)
-                    elif action == "Remove":
-                        self.confirm_uninstall(iter)
-                else:
-                    # Check if the click occurred on the "Details" column
-                    column = self.treeview.get_column(5)  # Get the "Details" column
-                    cell_area = treeview.get_cell_area(row, column)
-                    cell_x, cell_y, cell_width, cell_height = cell_area.x, cell_area.y, cell_area.width, cell_area.height
-
-                    # Check if the click occurred within the boundaries of the "Details" cell
-                    if event.x >= cell_x and event.x <= cell_x + cell_width and \
-                    event.y >= cell_y and event.y <= cell_y + cell_height:
-                        iter = self.liststore.get_iter(row)
+                    # Dispatch on the action text with a single dict lookup
+                    handler = self.action_handlers.get(action)
+                    if handler:
+                        handler(iter)
+                elif column is self.treeview.get_column(5):  # The "Details" column
+                    iter = self.liststore.get_iter(row)
                     package_info = {
                         "category": self.liststore.get_value(iter, 0),
                         "name": self.liststore.get_value(iter, 1),
                         "version": self.liststore.get_value(iter, 2),
-                        "installed": self.liststore.get_value(iter, 4) in ["Remove", "Protected"]  # Check if action is "Remove" or "Protected"
+                        "installed": self.liststore.get_value(iter, 4) in INSTALLED_ACTIONS  # Check if action is "Remove" or "Protected"
                     }
                     self.show_package_details_popup(package_info)
 
-    def show_protected_popup(self, row):
-        category = self.liststore[row][0]  # Extract category from the row
-        name = self.liststore[row][1]      # Extract name from the row
+    def show_protected_popup(self, iter):
+        category = self.liststore.get_value(iter, 0)
+        name = self.liststore.get_value(iter, 1)
         package_key = f"{category}/{name}"
 
-        if package_key in self.protected_applications:
-            message = self.protected_applications[package_key]
-        else:
-            message = f"This package ({category}/{name}) is protected and can't be removed."
+        # Look the message up once, falling back to a generic one
+        message = PROTECTED_APPLICATIONS.get(package_key)
+        if message is None:
+            message = f"This package ({package_key}) is protected and can't be removed."
         
         dialog = Gtk.MessageDialog(
             parent=self,
@@ -808,6 +970,7 @@ class SearchApp(Gtk.Window):
     def confirm_install(self, iter):
         category = self.liststore.get_value(iter, 0)
         name = self.liststore.get_value(iter, 1)
+        package_key = f"{category}/{name}"
         message = f"Do you want to install {name}?"
         dialog = Gtk.MessageDialog(
             parent=self,
@@ -820,24 +983,23 @@ class SearchApp(Gtk.Window):
         dialog.destroy()
         if response == Gtk.ResponseType.YES:
             advanced_search = self.advanced_search_checkbox.get_active()
-            install_command = f"luet install -y {category}/{name} && xdg-desktop-menu forceupdate"
+            install_command = f"luet install -y {package_key}"
 
             # Disable GUI while installation is running
             self.disable_gui()
+            self.results_generation += 1
 
             # Start the spinner animation
             self.start_spinner(f"Installing {name}...")
 
             # Create a new thread for the installation process
-            install_thread = threading.Thread(target=PackageOperations.run_installation, args=(self, install_command, name, advanced_search))
+            install_thread = threading.Thread(target=PackageOperations.run_installation, args=(self, install_command, category, name, advanced_search))
             install_thread.start()
 
-            # Schedule clearing the liststore after installation on the main GTK thread
-            GLib.idle_add(self.clear_liststore)
-
     def confirm_uninstall(self, iter):
         category = self.liststore.get_value(iter, 0)
         name = self.liststore.get_value(iter, 1)
+        package_key = f"{category}/{name}"
         message = f"Do you want to uninstall {name}?"
         dialog = Gtk.MessageDialog(
             parent=self,
@@ -852,13 +1014,14 @@ class SearchApp(Gtk.Window):
             advanced_search = self.advanced_search_checkbox.get_active()
             if category == "apps":
                 # If we uninstall a single app, try to also remove the reverse deps.
-                uninstall_command = f"luet uninstall -y {category}/{name} --full --solver-concurrent"
+                uninstall_command = f"luet uninstall -y {package_key} --full --solver-concurrent"
                 spinner_text = f"Uninstalling {name}... Please be patient we will also remove unneeded reverse deps"
             else:
-                uninstall_command = f"luet uninstall -y {category}/{name}"
+                uninstall_command = f"luet uninstall -y {package_key}"
                 spinner_text = f"Uninstalling {name}..."
             # Disable GUI while uninstallation is running
             self.disable_gui()
+            self.results_generation += 1
 
             # Start the spinner animation
             self.start_spinner(spinner_text)
@@ -867,11 +1030,9 @@ class SearchApp(Gtk.Window):
             uninstall_thread = threading.Thread(target=PackageOperations.run_uninstallation, args=(self, uninstall_command, category, name, advanced_search))
             uninstall_thread.start()
 
-            # Schedule clearing the liststore after uninstallation on the main GTK thread
-            GLib.idle_add(self.clear_liststore)
-
     def clear_liststore(self):
         self.liststore.clear()
+        self.displayed_rows = []
 
 
     def show_package_details_popup(self, package_info):
@@ -888,50 +1049,64 @@ class SearchApp(Gtk.Window):
         self.enable_gui()
         
 
-    def start_search_thread(self, search_command):
-        # Disable GUI while search is running
-        self.disable_gui()
-
-        # Clear the liststore
-        self.liststore.clear()
-
-        # Ensure that any references to rows are updated or invalidated
-        # For example, if you have references to specific rows, you may need to clear or update them here
-
-        # Start the search thread
-        self.search_thread = threading.Thread(target=self.run_search, args=(search_command,))
-        self.search_thread.start()
-
     def start_spinner(self, message):
+        # Only one spinner may run, otherwise the old timeout keeps ticking forever
+        self.stop_spinner()
+        # Build every frame of the status text once instead of on each tick
+        spinner_texts = [f"{frame} {message}" for frame in self.spinner_frames]
         # Start spinner animation
-        self.spinner_timeout_id = GLib.timeout_add(80, self.show_spinner, message)
+        self.spinner_timeout_id = GLib.timeout_add(80, self.show_spinner, spinner_texts)
 
     def stop_spinner(self):
         # Stop spinner animation
         if self.spinner_timeout_id:
             GLib.source_remove(self.spinner_timeout_id)
             self.spinner_timeout_id = None
+        if self.spinner_frame_pushed:
+            # Pop the spinner frame to reveal the message underneath
             self.status_bar.pop(self.status_bar_context_id)
+            self.spinner_frame_pushed = False
+            self.status_message = None
 
-    def show_spinner(self, message):
-        self.spinner_counter = (self.spinner_counter + 1) % len(self.spinner_frames)
-        frame = self.spinner_frames[self.spinner_counter]
+    def show_spinner(self, spinner_texts):
+        self.spinner_counter = (self.spinner_counter + 1) % len(spinner_texts)
         with self.lock:  # Acquire lock before critical section
-            self.status_bar.push(self.status_bar_context_id, f"{frame} {message}")
+            # Replace the previous frame instead of growing the status bar stack every tick
+            if self.spinner_frame_pushed:
+                self.status_bar.pop(self.status_bar_context_id)
+            self.status_bar.push(self.status_bar_context_id, spinner_texts[self.spinner_counter])
+            self.spinner_frame_pushed = True
+            # The spinner now covers the last status message
+            self.status_message = None
         return True
 
     def show_spinner_message(self, message):
         self.start_spinner(message)
 
     def set_status_message(self, message):
+        with self.status_message_lock:
+            self.pending_status_message = message
+            # An update is already queued; it will pick up this newer message
+            if self.status_update_scheduled:
+                return
+            self.status_update_scheduled = True
+
         # Schedule setting the status message in the main GTK thread
-        GLib.idle_add(self._set_status_message, message)
+        GLib.idle_add(self._set_status_message)
 
-    def _set_status_message(self, message):
+    def _set_status_message(self):
         # Acquire the lock before updating the status message
         with self.status_message_lock:
-            # Clear any previous messages
+            # Only the newest message requested since the last update is shown
+            message = self.pending_status_message
+            self.status_update_scheduled = False
+            # Nothing to do if the status bar already shows this message
+            if message == self.status_message:
+                return
+            self.status_message = message
+            # Clear any previous messages, including a spinner frame
             self.status_bar.remove_all(self.status_bar_context_id)
+            self.spinner_frame_pushed = False
             # Add the new message to the status bar
             self.status_bar.push(self.status_bar_context_id, message)
 